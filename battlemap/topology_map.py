@@ -17,6 +17,7 @@ except Exception:
     nx = None
 
 DEMO_TOPO = Path("examples/demo_topology.yaml")
+_figure_cache = None  # ((mtime_ns, size), figure): rebuilt only when the topology file changes
 
 # ---- Tunables ---------------------------------------------------
 THRESHOLDS = {
@@ -274,6 +275,15 @@ def _figure_for_topology(topology: dict) -> go.Figure:
     )
     return fig
 
+def _figure_for_file(path: Path) -> go.Figure:
+    """Figure for a topology file, shared across reruns and sessions until the file changes."""
+    global _figure_cache
+    st_ = path.stat()
+    key = (st_.st_mtime_ns, st_.st_size)
+    if _figure_cache is None or _figure_cache[0] != key:
+        _figure_cache = (key, _figure_for_topology(yaml.safe_load(path.read_text()) or {}))
+    return _figure_cache[1]
+
 # --------------------------- public API --------------------------
 
 def render_battlemap_if_available():
@@ -288,8 +298,7 @@ def render_battlemap_if_available():
         st.warning("networkx not installed; cannot render battlemap.")
         return
     try:
-        topology = yaml.safe_load(DEMO_TOPO.read_text()) or {}
-        fig = _figure_for_topology(topology)
+        fig = _figure_for_file(DEMO_TOPO)
         st.plotly_chart(fig, use_container_width=True)
     except Exception as e:
         st.error(f"Failed to render battlemap: {e}")
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+archive.py
+Compressed columnar archive for analyzed captures (zstd Parquet via pyarrow).
+One row per packet with decoded header columns; payloads are dropped by
+default or truncated to `payload_bytes`, so an archived incident can be
+re-opened without keeping the raw pcap (see docs/PRIVACY.md).
+Reads are memory-mapped and column-projected: only the columns asked for
+are touched.
+"""
+from pathlib import Path
+import sys
+
+ARCHIVE_SUFFIX = ".parquet"
+
+# column -> arrow type name; order is the on-disk column order
+SCHEMA = {
+    "ts": "float64",
+    "src": "string",        # IPv4 or IPv6 address
+    "dst": "string",
+    "proto": "uint8",       # decoded L4 header: 6 TCP, 17 UDP, 0 otherwise
+    "sport": "uint16",
+    "dport": "uint16",
+    "flags": "uint16",      # TCP flags, 0 otherwise
+    "seq": "uint32",
+    "ack": "uint32",
+    "ttl": "uint8",         # IPv4 TTL / IPv6 hop limit
+    "wire_len": "uint32",
+    "payload_len": "uint32",  # TCP/UDP payload bytes as captured
+    "raw": "bool",          # payload was left undissected (scapy Raw layer)
+    "payload": "binary",    # truncated payload, empty unless payload_bytes > 0
+}
+
+def _pyarrow():
+    # Imported on use: pyarrow is optional and slow to import.
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except Exception:
+        raise RuntimeError("pyarrow is required for capture archives (pip install pyarrow)")
+    return pa, pq
+
+def is_archive(path) -> bool:
+    return str(path).endswith(ARCHIVE_SUFFIX)
+
+def packet_columns(pkts, payload_bytes: int = 0) -> dict:
+    """Decode scapy packets into per-column numpy arrays (one row per packet)."""
+    import numpy as np
+    from scapy.all import IP, IPv6, TCP, UDP, Raw
+
+    cols = {name: [] for name in SCHEMA}
+    for p in pkts:
+        ip = p.getlayer(IP)
+        if ip is None:
+            ip = p.getlayer(IPv6)
+        tcp = p.getlayer(TCP) if ip is not None else None
+        l4 = tcp if tcp is not None else p.getlayer(UDP) if ip is not None else None
+        body = bytes(l4.payload) if l4 is not None else b""
+        is_tcp = tcp is not None
+        cols["ts"].append(float(p.time))
+        cols["src"].append(ip.src if ip is not None else None)
+        cols["dst"].append(ip.dst if ip is not None else None)
+        cols["proto"].append(6 if is_tcp else 17 if l4 is not None else 0)
+        cols["sport"].append(l4.sport if l4 is not None else 0)
+        cols["dport"].append(l4.dport if l4 is not None else 0)
+        cols["flags"].append(int(l4.flags) if is_tcp else 0)
+        cols["seq"].append(l4.seq if is_tcp else 0)
+        cols["ack"].append(l4.ack if is_tcp else 0)
+        cols["ttl"].append(0 if ip is None else ip.hlim if isinstance(ip, IPv6) else ip.ttl)
+        cols["wire_len"].append(getattr(p, "wirelen", None) or len(p))
+        cols["payload_len"].append(len(body))
+        cols["raw"].append(Raw in p)
+        cols["payload"].append(body[:payload_bytes])
+    return {name: np.array(vals, dtype=object if SCHEMA[name] in ("string", "binary") else SCHEMA[name])
+            for name, vals in cols.items()}
+
+def write_archive(pcap_path: str, out_path=None, payload_bytes: int = 0, row_group: int = 65536) -> Path:
+    """Stream a capture into the archive one row group at a time, so memory
+    stays bounded by `row_group` packets rather than the capture size."""
+    pa, pq = _pyarrow()
+    from itertools import islice
+    from scapy.all import PcapReader  # handles pcap and pcapng
+
+    out_path = Path(out_path) if out_path else Path(pcap_path).with_suffix(ARCHIVE_SUFFIX)
+    schema = pa.schema([(name, getattr(pa, t + "_" if t == "bool" else t)()) for name, t in SCHEMA.items()],
+                       metadata={"source": str(pcap_path), "payload_bytes": str(payload_bytes)})
+    count = 0
+    with PcapReader(str(pcap_path)) as reader, \
+            pq.ParquetWriter(str(out_path), schema, compression="zstd") as writer:
+        while batch := list(islice(reader, row_group)):
+            cols = packet_columns(batch, payload_bytes)
+            writer.write_table(pa.table({name: pa.array(cols[name], type=schema.field(name).type) for name in SCHEMA},
+                                        schema=schema), row_group_size=row_group)
+            count += len(batch)
+    print(f"[+] Wrote archive: {out_path} ({count} packets)")
+    return out_path
+
+def read_columns(path, columns=None) -> dict:
+    """Memory-mapped, column-projected read: {column: numpy array}."""
+    _, pq = _pyarrow()
+    table = pq.read_table(str(path), columns=columns, memory_map=True)
+    return {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m intel_core.archive <pcap> [out.parquet] [payload_bytes]")
+        sys.exit(1)
+    out = sys.argv[2] if len(sys.argv) > 2 else None
+    keep = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    write_archive(sys.argv[1], out, keep)
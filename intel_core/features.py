@@ -1,9 +1,24 @@
-from scapy.all import rdpcap, TCP, IP, Raw
 from collections import defaultdict
 
+from intel_core.archive import is_archive, packet_columns, read_columns
+
+# Columns the feature loop needs; archives are read with only these projected.
+FEATURE_COLUMNS = ["ts", "src", "dst", "proto", "sport", "dport", "flags", "seq", "payload_len", "raw"]
+
+def load_columns(pcap_path: str) -> dict:
+    """Feature columns from a pcap/pcapng, or from a columnar archive written by intel_core.archive."""
+    if is_archive(pcap_path):
+        return read_columns(pcap_path, FEATURE_COLUMNS)
+    from scapy.all import rdpcap  # lazy: scapy.all is slow to import
+    return packet_columns(rdpcap(pcap_path))
+
 def tcp_basic_features(pcap_path: str):
-    pkts = rdpcap(pcap_path)
-    total = len(pkts)
+    return features_from_columns(load_columns(pcap_path))
+
+def features_from_columns(cols: dict):
+    c = {name: cols[name].tolist() for name in FEATURE_COLUMNS}
+    total = len(c["ts"])
+    is_tcp = [proto == 6 for proto in c["proto"]]
 
     # Track handshake timing & simple retrans detection
     syn_time = None
@@ -23,29 +38,28 @@ def tcp_basic_features(pcap_path: str):
     server_port = None
 
     # Simple infer direction from first SYN
-    for p in pkts:
-        if TCP in p:
-            if p[TCP].flags & 0x02:  # SYN
-                client_ip = p[IP].src
-                client_port = p[TCP].sport
-                server_ip = p[IP].dst
-                server_port = p[TCP].dport
-                syn_time = float(p.time)
-                break
+    for i in range(total):
+        if is_tcp[i] and c["flags"][i] & 0x02:  # SYN
+            client_ip = c["src"][i]
+            client_port = c["sport"][i]
+            server_ip = c["dst"][i]
+            server_port = c["dport"][i]
+            syn_time = c["ts"][i]
+            break
 
-    for p in pkts:
-        if not (IP in p and TCP in p):
+    for i in range(total):
+        if not is_tcp[i]:
             continue
-        t = float(p.time)
-        ip = p[IP]; tcp = p[TCP]
-        key = (ip.src, tcp.sport, tcp.seq, len(bytes(p[TCP].payload)))
-        if key in seen_seq and tcp.flags & 0x10:  # ACK with same seq/len again -> rough retrans indicator
+        t = c["ts"][i]
+        src = c["src"][i]; sport = c["sport"][i]; flags = c["flags"][i]
+        plen = c["payload_len"][i]
+        key = (src, sport, c["seq"][i], plen)
+        if key in seen_seq and flags & 0x10:  # ACK with same seq/len again -> rough retrans indicator
             retrans += 1
         else:
             seen_seq.add(key)
 
-        direction = "fwd" if (client_ip and ip.src == client_ip and tcp.sport == client_port) else "rev"
-        plen = len(bytes(tcp.payload))
+        direction = "fwd" if (client_ip and src == client_ip and sport == client_port) else "rev"
         if direction == "fwd":
             fwd_pkts += 1
             fwd_bytes += plen
@@ -53,12 +67,12 @@ def tcp_basic_features(pcap_path: str):
             rev_pkts += 1
             rev_bytes += plen
 
-        if (tcp.flags & 0x12) == 0x12 and synack_time is None and syn_time is not None:
+        if (flags & 0x12) == 0x12 and synack_time is None and syn_time is not None:
             # SYN-ACK observed
             synack_time = t
 
         # app-layer-ish bytes (payload present)
-        if plen > 0 and Raw in p:
+        if plen > 0 and c["raw"][i]:
             bytes_app += plen
 
     syn_rtt = (synack_time - syn_time) if (syn_time and synack_time) else None
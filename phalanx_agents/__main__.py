@@ -0,0 +1,3 @@
+from phalanx_agents.cli import main
+
+main()
@@ -0,0 +1,110 @@
+"""
+advisor_service.py
+Long-running consensus service. Keeps open proposals in memory and folds
+incremental agent votes into a running Tally, so each vote is O(1) and no
+process start or disk I/O happens on the vote path.
+The decision is written to artifacts/advice.json (and released to any waiting
+GET /proposals/{pid}/decision) the moment min_trust/min_votes are met.
+Decided proposals are kept for DECIDED_TTL seconds so late readers can still
+fetch the outcome; undecided ones expire after MAX_AGE seconds.
+
+Run with:
+  uvicorn phalanx_agents.advisor_service:app --port 8081
+"""
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+import asyncio, itertools, json, os, time
+
+from phalanx_agents.advisor_unit import load_policy, Tally, ADVICE
+
+app = FastAPI(title="Phalanx Advisor Service")
+
+POLICY = load_policy()
+PROPOSALS: dict[str, dict] = {}
+_ids = itertools.count(1)
+DECIDED_TTL = float(os.environ.get("PHALANX_DECIDED_TTL_S", "300"))
+MAX_AGE = float(os.environ.get("PHALANX_PROPOSAL_MAX_AGE_S", "3600"))
+
+class ProposalIn(BaseModel):
+    action: str
+
+class VoteIn(BaseModel):
+    role: str
+    agent: str | None = None   # dedupe key; defaults to the role
+
+def _get(pid: str) -> dict:
+    prop = PROPOSALS.get(pid)
+    if prop is None:
+        raise HTTPException(status_code=404, detail=f"unknown proposal {pid}")
+    return prop
+
+def _view(pid: str, prop: dict) -> dict:
+    tally = prop["tally"]
+    return {"id": pid, "action": tally.action, "approved": prop["decided"].is_set(),
+            "votes": tally.counted, "trust_avg": tally.trust_avg(), "requirements": tally.need}
+
+def _sweep(now: float):
+    """Drop decided proposals past DECIDED_TTL and undecided ones past MAX_AGE.
+
+    Waiters were released when the decision was set (or hold their own
+    reference until their timeout), so eviction only affects later lookups.
+    """
+    for pid, prop in list(PROPOSALS.items()):
+        decided_at = prop["decided_at"]
+        if (decided_at is not None and now - decided_at > DECIDED_TTL) or now - prop["opened"] > MAX_AGE:
+            del PROPOSALS[pid]
+
+# All handlers are async and run on the event loop thread, so proposal state
+# is never touched concurrently and needs no lock.
+
+@app.post("/proposals")
+async def open_proposal(body: ProposalIn):
+    need = POLICY.get("actions", {}).get(body.action)
+    if not need:
+        raise HTTPException(status_code=400, detail="unknown_action")
+    now = time.monotonic()
+    _sweep(now)
+    pid = str(next(_ids))
+    PROPOSALS[pid] = {"tally": Tally(body.action, need, POLICY.get("roles", {})),
+                      "voters": set(), "decided": asyncio.Event(), "opened": now, "decided_at": None}
+    return _view(pid, PROPOSALS[pid])
+
+@app.post("/proposals/{pid}/votes")
+async def vote(pid: str, body: VoteIn):
+    prop = _get(pid)
+    voter = body.agent or body.role
+    if prop["decided"].is_set() or voter in prop["voters"]:
+        return _view(pid, prop)
+    prop["voters"].add(voter)
+    if prop["tally"].add(body.role):
+        # Thresholds met: freeze the proposal and push the decision out.
+        prop["decided"].set()
+        prop["decided_at"] = time.monotonic()
+        ADVICE.write_text(json.dumps(prop["tally"].result(), indent=2))
+    return _view(pid, prop)
+
+@app.get("/proposals/{pid}")
+async def get_proposal(pid: str):
+    return _view(pid, _get(pid))
+
+@app.get("/proposals/{pid}/decision")
+async def wait_decision(pid: str, timeout: float = 30.0):
+    prop = _get(pid)
+    try:
+        await asyncio.wait_for(prop["decided"].wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return _view(pid, prop)
+
+@app.delete("/proposals/{pid}")
+async def withdraw(pid: str):
+    prop = PROPOSALS.pop(pid, None)
+    if prop is None:
+        raise HTTPException(status_code=404, detail=f"unknown proposal {pid}")
+    return _view(pid, prop)
+
+@app.post("/policy/reload")
+async def reload_policy():
+    global POLICY
+    POLICY = load_policy()
+    return {"status": "ok", "actions": sorted(POLICY.get("actions", {}))}
@@ -15,6 +15,32 @@ def load_policy():
         raise SystemExit("trust_policy.json not found")
     return json.loads(POLICY.read_text())
 
+class Tally:
+    """Running trust/vote aggregate for one proposal; each vote is O(1)."""
+    def __init__(self, action: str, need: dict, roles: dict):
+        self.action = action
+        self.need = need
+        self.roles = roles
+        self.trust_sum = 0.0
+        self.counted = 0
+        self.details = []
+
+    def add(self, role: str) -> bool:
+        t = self.roles.get(role, 0.0)
+        self.trust_sum += t
+        self.counted += 1
+        self.details.append({"role": role, "trust": t})
+        return self.approved()
+
+    def trust_avg(self) -> float:
+        return self.trust_sum / max(self.counted, 1)
+
+    def approved(self) -> bool:
+        return (self.trust_avg() >= self.need["min_trust"]) and (self.counted >= self.need["min_votes"])
+
+    def result(self) -> dict:
+        return {"action": self.action, "approved": self.approved(), "votes": self.details, "requirements": self.need, "trust_avg": self.trust_avg()}
+
 def evaluate(action: str, votes: list[str]):
     pol = load_policy()
     actions = pol.get("actions", {})
@@ -24,17 +50,11 @@ def evaluate(action: str, votes: list[str]):
         return {"action": action, "approved": False, "reason": "unknown_action"}
 
     # Sum trust across roles present in votes; also count votes
-    trust_sum = 0.0
-    counted = 0
-    details = []
+    tally = Tally(action, need, roles)
     for v in votes:
-        t = roles.get(v, 0.0)
-        trust_sum += t
-        counted += 1
-        details.append({"role": v, "trust": t})
+        tally.add(v)
 
-    approved = (trust_sum / max(counted,1) >= need["min_trust"]) and (counted >= need["min_votes"])
-    result = {"action": action, "approved": approved, "votes": details, "requirements": need, "trust_avg": (trust_sum / max(counted,1))}
+    result = tally.result()
     ADVICE.write_text(json.dumps(result, indent=2))
     return result
 
@@ -2,17 +2,30 @@
 capture_unit.py
 Start/stop scoped rotating captures using dumpcap (preferred) or tcpdump.
 Writes PID files and a small manifest to artifacts/captures/.
+`supervise` watches every running capture (liveness, bytes/s, drops), keeps
+artifacts/captures under a global disk budget, degrades snaplen/BPF under
+pressure and restores it once usage stays low; its metrics are written into the manifest under "health".
+`agent` streams each closed ring file, compressed, to the ingest API.
 """
 from pathlib import Path
-import os, json, subprocess, sys, shutil
+import os, json, subprocess, sys, shutil, struct, threading, time
+
+from phalanx_agents import metrics
 
 ART = Path("artifacts"); ART.mkdir(exist_ok=True)
 CAPDIR = ART / "captures"; CAPDIR.mkdir(exist_ok=True)
 MANIFEST = CAPDIR / "manifest.json"
 
+DISK_BUDGET_MB = int(os.environ.get("PHALANX_CAPTURE_BUDGET_MB", "2048"))
+HIGH_WATER = 0.9                # projected ring usage above this share of budget = pressure
+LOW_WATER = 0.5                 # below this for CALM_TICKS ticks, step a degraded node back up
+CALM_TICKS = 3
+SNAPLEN_STEPS = [0, 256, 128]   # pressure levels: full packets -> headers -> minimal headers
+CONTROL_ONLY = "tcp[tcpflags] & (tcp-syn|tcp-fin|tcp-rst) != 0"  # last resort: handshakes/teardowns only
+
 def has(cmd): return shutil.which(cmd) is not None
 
-def start(node: str, bpf: str, duration=30, files=20):
+def start(node: str, bpf: str, duration=30, files=20, snaplen=0):
     outdir = CAPDIR / node
     outdir.mkdir(exist_ok=True)
     pcap_path = outdir / "cap.pcapng"
@@ -23,9 +36,10 @@ def start(node: str, bpf: str, duration=30, files=20):
 
     if has("dumpcap"):
         cmd = ["dumpcap", "-f", bpf, "-b", f"duration:{duration}", "-b", f"files:{files}", "-w", str(pcap_path)]
+        if snaplen: cmd[1:1] = ["-s", str(snaplen)]
     elif has("tcpdump"):
         # Fallback: rotate by time using tcpdump (-G / -W)
-        cmd = ["tcpdump", "-n", "-s", "0", "-w", str(outdir / "cap_%Y%m%d%H%M%S.pcap"), "-G", str(duration), "-W", str(files), bpf]
+        cmd = ["tcpdump", "-n", "-s", str(snaplen), "-w", str(outdir / "cap_%Y%m%d%H%M%S.pcap"), "-G", str(duration), "-W", str(files), bpf]
     else:
         raise SystemExit("Neither dumpcap nor tcpdump found. Please install one.")
 
@@ -35,7 +49,7 @@ def start(node: str, bpf: str, duration=30, files=20):
 
     # update manifest
     manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
-    manifest[node] = {"bpf": bpf, "duration": duration, "files": files, "pid": proc.pid}
+    manifest[node] = {"bpf": bpf, "duration": duration, "files": files, "snaplen": snaplen, "pid": proc.pid}
     MANIFEST.write_text(json.dumps(manifest, indent=2))
     print(f"▶️ capture started for {node} (pid {proc.pid}) → {outdir}")
 
@@ -60,9 +74,405 @@ def status():
     manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
     print(json.dumps(manifest, indent=2))
 
+# --------------------------- supervisor --------------------------
+
+def _alive(pid: int) -> bool:
+    # Captures restarted by _degrade are our children: reap them once they
+    # exit, otherwise the zombie still answers kill(pid, 0).
+    try:
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass  # started by another process (CLI `start`)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else (e.g. root dumpcap)
+    try:
+        # Exited but not yet reaped by its own parent.
+        return Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True  # no procfs (macOS); kill() succeeded
+
+
+def _ring_stats(node: str) -> list[tuple[Path, os.stat_result]]:
+    """(path, stat) of a node's ring files, oldest first, each stat'ed once.
+
+    The ring rotates and the supervisor prunes underneath us, so files that
+    vanish between the glob and the stat are skipped.
+    """
+    outdir = CAPDIR / node
+    if not outdir.exists():
+        return []
+    found = []
+    for p in outdir.glob("cap*.pcap*"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        found.append((p, st))
+    found.sort(key=lambda f: f[1].st_mtime)
+    return found
+
+def _node_dirs() -> list[str]:
+    """Every node with a capture directory, running or stopped."""
+    return sorted(p.name for p in CAPDIR.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+def _ring_files(node: str) -> list[Path]:
+    """Ring files for a node, oldest first. The last one is the file being written."""
+    return [p for p, _ in _ring_stats(node)]
+
+def _pcapng_drops(path: Path):
+    """Return (if_drop, os_drop) from the Interface Statistics Blocks of a closed pcapng file.
+
+    dumpcap's ISB counters are cumulative since capture start, so the newest
+    closed file carries the current totals. Returns None for classic pcap.
+    """
+    if_drop = os_drop = None
+    with path.open("rb") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"\x0a\x0d\x0d\x0a":
+            return None
+        e = "<" if head[8:12] == b"\x4d\x3c\x2b\x1a" else ">"
+        pos = 0
+        while True:
+            f.seek(pos)
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                break
+            btype, blen = struct.unpack(e + "II", hdr)
+            if blen < 12:
+                break
+            if btype == 5:  # ISB: if_id(4) ts_hi(4) ts_lo(4) then options
+                body = f.read(blen - 12)
+                off = 12
+                while off + 4 <= len(body):
+                    code, olen = struct.unpack_from(e + "HH", body, off)
+                    if code == 0:
+                        break
+                    if olen == 8 and code in (5, 7):  # isb_ifdrop / isb_osdrop
+                        val = struct.unpack_from(e + "Q", body, off + 4)[0]
+                        if code == 5: if_drop = (if_drop or 0) + val
+                        else: os_drop = (os_drop or 0) + val
+                    off += 4 + ((olen + 3) & ~3)
+            pos += blen
+    return if_drop, os_drop
+
+def _kernel_rx_drops():
+    """Host-wide rx drop counter from /proc/net/dev (Linux only)."""
+    try:
+        lines = Path("/proc/net/dev").read_text().splitlines()[2:]
+    except OSError:
+        return None
+    return sum(int(line.split(":", 1)[1].split()[3]) for line in lines if ":" in line)
+
+def _prune(budget: int, running) -> tuple[int, int]:
+    """Delete the oldest closed files under artifacts/captures until usage fits the budget.
+
+    Covers every node directory, including ring files left behind by stopped
+    captures (all closed), and the agent's compressed .outbox copies.
+
+    Files frozen into an incident (st_nlink > 1, see trigger_unit) still count
+    towards usage but are never pruned: unlinking the ring name would free
+    nothing while the incident holds the inode. They stay on the budget until
+    dumpcap rotates them out, so pressure shows up as degradation rather than
+    as a budget we only appear to meet. Incident directories themselves are
+    kept until an operator removes them.
+    """
+    closed, total = [], 0
+    for node in _node_dirs():
+        files = _ring_stats(node)
+        total += sum(st.st_size for _, st in files)
+        closed += [f for f in (files[:-1] if node in running else files) if f[1].st_nlink == 1]
+    for p in OUTBOX.glob("*") if OUTBOX.exists() else ():
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        total += st.st_size
+        if not p.name.endswith(".tmp"):  # still being compressed
+            closed.append((p, st))
+    closed.sort(key=lambda f: f[1].st_mtime)
+    pruned = 0
+    for p, st in closed:
+        if total <= budget:
+            break
+        p.unlink(missing_ok=True)
+        total -= st.st_size
+        pruned += 1
+    return total, pruned
+
+def _degrade(node: str, entry: dict, step: int = 1):
+    """Restart a capture one pressure level down (smaller snaplen, then control
+    packets only), or back up one level with step=-1."""
+    level = entry.get("pressure_level", 0) + step
+    base_bpf = entry.get("base_bpf", entry["bpf"])
+    snaplen = SNAPLEN_STEPS[min(level, len(SNAPLEN_STEPS) - 1)]
+    bpf = base_bpf if level < len(SNAPLEN_STEPS) else f"({base_bpf}) and {CONTROL_ONLY}"
+    stop(node)
+    start(node, bpf, entry.get("duration", 30), entry.get("files", 20), snaplen)
+    manifest = json.loads(MANIFEST.read_text())
+    manifest[node].update({"base_bpf": base_bpf, "pressure_level": level, "degraded_at": time.time()})
+    MANIFEST.write_text(json.dumps(manifest, indent=2))
+    print(f"{'⚠️ disk pressure' if step > 0 else '✅ pressure eased'}: {node} → level {level} "
+          f"(snaplen={snaplen or 'full'}, bpf={bpf})")
+
+def supervise(interval=5, budget_mb=DISK_BUDGET_MB, once=False):
+    budget = budget_mb * 1024 * 1024
+    prev_sizes: dict[str, dict[str, int]] = {}
+    drop_cache: dict[Path, tuple] = {}
+    prev_kdrops = _kernel_rx_drops()
+    calm = 0  # consecutive ticks below LOW_WATER
+    while True:
+        manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+        usage, pruned = _prune(budget, manifest)
+        kdrops = _kernel_rx_drops()
+        kdelta = (kdrops - prev_kdrops) if (kdrops is not None and prev_kdrops is not None) else None
+        prev_kdrops = kdrops
+
+        health, projected = {}, 0.0
+        for node, entry in manifest.items():
+            files = _ring_stats(node)
+            sizes = {p.name: st.st_size for p, st in files}
+            last = prev_sizes.get(node)
+            written = sum(max(0, n - last.get(name, 0)) for name, n in sizes.items()) if last is not None else 0
+            prev_sizes[node] = sizes
+            rate = written / interval
+
+            drops = None
+            if len(files) > 1:
+                newest_closed, st = files[-2]
+                key = (newest_closed, st.st_mtime)
+                if key not in drop_cache:
+                    try:
+                        drop_cache[key] = _pcapng_drops(newest_closed)
+                    except FileNotFoundError:
+                        drop_cache[key] = None  # pruned since the stat
+                drops = drop_cache[key]
+
+            projected += rate * entry.get("duration", 30) * entry.get("files", 20)
+            health[node] = {
+                "alive": _alive(entry["pid"]),
+                "bytes_per_s": round(rate, 1),
+                "ring_files": len(files),
+                "bytes_on_disk": sum(sizes.values()),
+                "if_drops": drops[0] if drops else None,
+                "os_drops": drops[1] if drops else None,
+                "kernel_rx_drops": kdelta,
+                "pressure_level": entry.get("pressure_level", 0),
+                "checked_at": time.time(),
+            }
+
+        for node, h in health.items():
+            metrics.CAPTURE_ALIVE.set(int(h["alive"]), node=node)
+            metrics.CAPTURE_RATE.set(h["bytes_per_s"], node=node)
+            metrics.CAPTURE_DISK.set(h["bytes_on_disk"], node=node)
+        metrics.write_snapshot("capture_unit")
+
+        # Re-read before writing so concurrent start/stop calls are not clobbered.
+        manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+        for node, h in health.items():
+            if node in manifest:
+                manifest[node]["health"] = {**h, "disk_usage": usage, "disk_budget": budget, "pruned": pruned}
+        MANIFEST.write_text(json.dumps(manifest, indent=2))
+
+        # Under pressure, degrade the busiest live capture by one level per tick,
+        # giving each degraded node a few ticks for its rate to settle. Once
+        # usage has stayed below LOW_WATER for CALM_TICKS ticks, restore the
+        # most degraded node one level at a time (the gap to HIGH_WATER keeps
+        # a node from flapping).
+        now = time.time()
+        settled = [n for n, h in health.items()
+                   if n in manifest and h["alive"] and now - manifest[n].get("degraded_at", 0) >= 3 * interval]
+        calm = calm + 1 if projected < budget * LOW_WATER and not pruned else 0
+        target, step = None, 0
+        if projected > budget * HIGH_WATER or pruned:
+            candidates = [n for n in settled if manifest[n].get("pressure_level", 0) < len(SNAPLEN_STEPS)]
+            if candidates:
+                target, step = max(candidates, key=lambda n: health[n]["bytes_per_s"]), 1
+        elif calm >= CALM_TICKS:
+            candidates = [n for n in settled if manifest[n].get("pressure_level", 0) > 0]
+            if candidates:
+                target, step = max(candidates, key=lambda n: manifest[n]["pressure_level"]), -1
+                calm = 0
+        if target:
+            try:
+                _degrade(target, manifest[target], step)
+            except SystemExit as e:
+                print(f"❌ could not restart {target}: {e}")
+
+        if once:
+            return health
+        time.sleep(interval)
+
+# ----------------------------- agent -----------------------------
+
+SENT = CAPDIR / "sent.json"       # sha256 -> saved path on the collector
+OUTBOX = CAPDIR / ".outbox"       # compressed copies kept until acknowledged
+CHUNK = 1 << 20                   # upload chunk; a retry resumes at chunk granularity
+RETRIES = 5
+SENT_MAX = 10000                  # newest digests remembered; older ones fall back to GET /stream
+
+class _Collector:
+    """Keep-alive HTTP connection per worker thread to the ingest API."""
+
+    def __init__(self, url: str):
+        from urllib.parse import urlsplit
+        u = urlsplit(url)
+        self.https = u.scheme == "https"
+        self.host, self.port = u.hostname, u.port
+        self.base = u.path.rstrip("/")
+        self._local = threading.local()
+
+    def _conn(self):
+        import http.client
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=30)
+        return conn
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        conn = self._conn()
+        try:
+            conn.request(method, self.base + path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+            data = resp.read()  # drain fully so the connection can be reused
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+        return resp.status, (json.loads(data) if data else {})
+
+def _upload(col: _Collector, path: Path, digest: str, node: str, hop: int, encoding: str) -> str:
+    from urllib.parse import urlencode
+    from signal_capture.compression import compress_file
+
+    OUTBOX.mkdir(exist_ok=True)
+    packed = OUTBOX / f"{digest}.{encoding}"
+
+    for attempt in range(RETRIES):
+        try:
+            status, body = col.request("GET", f"/stream/{digest}")
+            if body.get("complete"):  # already collected (e.g. sent by a previous agent run)
+                packed.unlink(missing_ok=True)
+                return body["saved"]
+            if not packed.exists():
+                compress_file(path, packed, encoding)
+            total = packed.stat().st_size
+            offset = body.get("received", 0)
+            with packed.open("rb") as f:
+                while True:
+                    f.seek(offset)
+                    chunk = f.read(CHUNK)
+                    q = urlencode({"node": node, "hop": hop, "name": path.name, "offset": offset,
+                                   "total": total, "encoding": encoding})
+                    status, body = col.request("PUT", f"/stream/{digest}?{q}", body=chunk,
+                                               headers={"Content-Type": "application/octet-stream"})
+                    if status == 409:      # collector has a different offset; resume there
+                        offset = body["detail"]["received"]
+                        continue
+                    if status != 200:
+                        raise RuntimeError(f"HTTP {status}: {body}")
+                    if body["status"] in ("ok", "duplicate"):
+                        packed.unlink(missing_ok=True)
+                        return body["saved"]
+                    offset = body["received"]
+        except Exception as e:
+            if isinstance(e, FileNotFoundError) and not path.exists() and not packed.exists():
+                # Rotated or pruned before it was compressed: nothing left to send.
+                raise RuntimeError(f"{path.name} vanished before upload") from None
+            wait = min(30, 2 ** attempt)
+            print(f"↻ {path.name}: {e} (retry in {wait}s)")
+            time.sleep(wait)
+    raise RuntimeError(f"giving up on {path.name} after {RETRIES} attempts")
+
+def agent(url: str, hop=0, workers=4, interval=5, once=False):
+    """Stream closed ring files to the ingest API; each file's content is sent once."""
+    from concurrent.futures import ThreadPoolExecutor
+    from signal_capture.compression import DEFAULT_ENCODING, sha256_file
+
+    col = _Collector(url)
+    sent = json.loads(SENT.read_text()) if SENT.exists() else {}
+    digests: dict[tuple, str] = {}   # (path, mtime, size) -> sha256, so files are hashed once
+    inflight: set[str] = set()
+    lock = threading.Lock()
+    dirty = False
+
+    def ship(path: Path, digest: str, node: str):
+        nonlocal dirty
+        try:
+            saved = _upload(col, path, digest, node, hop, DEFAULT_ENCODING)
+            with lock:
+                sent[digest] = saved
+                while len(sent) > SENT_MAX:  # insertion order: drop the oldest
+                    del sent[next(iter(sent))]
+                dirty = True
+            print(f"⬆️ {node}/{path.name} → {saved}")
+        except Exception as e:
+            print(f"❌ {node}/{path.name}: {e}")
+        finally:
+            with lock:
+                inflight.discard(digest)
+                metrics.QUEUE_DEPTH.set(len(inflight), queue="capture_agent")
+
+    def save_sent():
+        # Once per tick rather than per file; the collector's GET /stream
+        # covers anything lost between saves.
+        nonlocal dirty
+        with lock:
+            if not dirty:
+                return
+            data, dirty = json.dumps(sent, indent=2), False
+        tmp = SENT.with_name(SENT.name + ".tmp")
+        tmp.write_text(data)
+        tmp.replace(SENT)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="phalanx-agent") as pool:
+        while True:
+            manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+            seen = set()
+            for outdir in sorted(p for p in CAPDIR.iterdir() if p.is_dir() and not p.name.startswith(".")):
+                node = outdir.name
+                files = _ring_files(node)
+                closed = files[:-1] if node in manifest else files  # newest file is still being written
+                for path in closed:
+                    try:
+                        st = path.stat()
+                        key = (path, st.st_mtime, st.st_size)
+                        if key not in digests:
+                            digests[key] = sha256_file(path)
+                    except FileNotFoundError:
+                        continue  # rotated or pruned away meanwhile
+                    seen.add(key)
+                    digest = digests[key]
+                    with lock:
+                        if digest in sent or digest in inflight:
+                            continue
+                        inflight.add(digest)
+                        metrics.QUEUE_DEPTH.set(len(inflight), queue="capture_agent")
+                    pool.submit(ship, path, digest, node)
+            for key in digests.keys() - seen:  # file rotated or pruned away
+                del digests[key]
+            # Outbox copies of files that are gone and no longer being sent
+            # (e.g. a transfer that gave up) would otherwise stay forever.
+            live = set(digests.values())
+            with lock:
+                live |= inflight
+            for p in OUTBOX.glob("*") if OUTBOX.exists() else ():
+                if p.name.split(".", 1)[0] not in live:
+                    p.unlink(missing_ok=True)
+            save_sent()
+            if once:
+                break
+            time.sleep(interval)
+    save_sent()
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage:\n  python -m phalanx_agents.capture_unit start <node> <BPF>\n  python -m phalanx_agents.capture_unit stop <node>\n  python -m phalanx_agents.capture_unit status")
+        print("Usage:\n  python -m phalanx_agents.capture_unit start <node> <BPF>\n  python -m phalanx_agents.capture_unit stop <node>\n  python -m phalanx_agents.capture_unit status\n  python -m phalanx_agents.capture_unit supervise [interval_s] [budget_mb]\n  python -m phalanx_agents.capture_unit agent <ingest_url> [hop] [workers]")
         raise SystemExit(1)
     cmd = sys.argv[1]
     if cmd == "start":
@@ -73,5 +483,14 @@ if __name__ == "__main__":
         stop(sys.argv[2])
     elif cmd == "status":
         status()
+    elif cmd == "supervise":
+        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        budget_mb = int(sys.argv[3]) if len(sys.argv) > 3 else DISK_BUDGET_MB
+        supervise(interval, budget_mb)
+    elif cmd == "agent":
+        if len(sys.argv) < 3: raise SystemExit("agent requires <ingest_url>")
+        hop = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        workers = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+        agent(sys.argv[2], hop, workers)
     else:
         raise SystemExit(f"unknown command: {cmd}")
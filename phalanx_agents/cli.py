@@ -0,0 +1,119 @@
+"""
+cli.py
+Unified `python -m phalanx_agents <command>` entry point.
+Only argparse is imported up front; each command imports its unit when it
+runs, so status/advise/capture never pay for scapy, numpy or pyarrow.
+Guarded by `make check-startup`.
+"""
+import argparse, json
+
+def _status(args):
+    from phalanx_agents.viz_unit import snapshot
+    print(json.dumps(snapshot(), indent=2))
+
+def _advise(args):
+    from phalanx_agents.advisor_unit import evaluate
+    print(json.dumps(evaluate(args.action, args.roles.split(",")), indent=2))
+
+def _capture(args):
+    from phalanx_agents import capture_unit
+    if args.op == "start":
+        if not args.bpf: raise SystemExit("start requires <node> and <BPF>")
+        capture_unit.start(args.node, " ".join(args.bpf), args.duration, args.files, args.snaplen)
+    elif args.op == "stop":
+        if not args.node: raise SystemExit("stop requires <node>")
+        capture_unit.stop(args.node)
+    elif args.op == "status":
+        capture_unit.status()
+    elif args.op == "agent":
+        if not args.collector: raise SystemExit("agent requires --collector <ingest_url>")
+        capture_unit.agent(args.collector, args.hop, args.workers, args.interval)
+    else:
+        capture_unit.supervise(args.interval, args.budget_mb)
+
+def _merge(args):
+    from phalanx_agents.stitch_unit import merge_pcaps
+    merge_pcaps(args.pcaps, args.output)
+
+def _analyze(args):
+    from phalanx_agents.intel_unit import run
+    print(json.dumps(run(args.pcap), indent=2))
+
+def _archive(args):
+    from intel_core.archive import write_archive
+    write_archive(args.pcap, args.output, args.payload_bytes)
+
+def _trigger(args):
+    from phalanx_agents.trigger_unit import trigger
+    trigger(args.incident, args.at, before=args.before, after=args.after, analyze=not args.no_analyze)
+
+def _demo(args):
+    from ui.demo_mode import run_demo
+    print(json.dumps(run_demo(), indent=2))
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="phalanx", description="Phalanx SRE battlefield units")
+    ap.add_argument("--profile", action="store_true", help="write per-stage profile to artifacts/profile/")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sp = sub.add_parser("status", help="aggregate artifacts into status.json")
+    sp.set_defaults(func=_status)
+
+    sp = sub.add_parser("advise", help="evaluate a remediation against trust_policy.json")
+    sp.add_argument("action")
+    sp.add_argument("roles", help="comma-separated voting roles, e.g. SREBot,OpsLeadAgent")
+    sp.set_defaults(func=_advise)
+
+    sp = sub.add_parser("capture", help="start/stop/status/supervise/agent for rotating captures")
+    sp.add_argument("op", choices=["start", "stop", "status", "supervise", "agent"])
+    sp.add_argument("node", nargs="?")
+    sp.add_argument("bpf", nargs="*")
+    sp.add_argument("--duration", type=int, default=30)
+    sp.add_argument("--files", type=int, default=20)
+    sp.add_argument("--snaplen", type=int, default=0)
+    sp.add_argument("--interval", type=int, default=5)
+    sp.add_argument("--budget-mb", type=int, default=None)
+    sp.add_argument("--collector", help="ingest API base URL for `agent`, e.g. http://collector:8000")
+    sp.add_argument("--hop", type=int, default=0)
+    sp.add_argument("--workers", type=int, default=4)
+    sp.set_defaults(func=_capture)
+
+    sp = sub.add_parser("merge", help="stitch multi-hop pcaps by timestamp")
+    sp.add_argument("pcaps", nargs="+")
+    sp.add_argument("-o", "--output", default="artifacts/merged.pcap")
+    sp.set_defaults(func=_merge)
+
+    sp = sub.add_parser("analyze", help="features + rules + explanation")
+    sp.add_argument("pcap", nargs="?", default="artifacts/merged.pcap")
+    sp.set_defaults(func=_analyze)
+
+    sp = sub.add_parser("archive", help="write a columnar archive of a capture")
+    sp.add_argument("pcap")
+    sp.add_argument("-o", "--output")
+    sp.add_argument("--payload-bytes", type=int, default=0)
+    sp.set_defaults(func=_archive)
+
+    sp = sub.add_parser("trigger", help="freeze ring files around an alert")
+    sp.add_argument("incident")
+    sp.add_argument("--before", type=float, default=120)
+    sp.add_argument("--after", type=float, default=30)
+    sp.add_argument("--at", type=float, help="alert time (epoch seconds) to centre the window on; default now")
+    sp.add_argument("--no-analyze", action="store_true")
+    sp.set_defaults(func=_trigger)
+
+    sp = sub.add_parser("demo", help="generate, merge and analyze the demo capture")
+    sp.set_defaults(func=_demo)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "capture" and args.budget_mb is None:
+        from phalanx_agents.capture_unit import DISK_BUDGET_MB
+        args.budget_mb = DISK_BUDGET_MB
+    from phalanx_agents import metrics, profiling
+    with profiling.session(args.command, enabled=args.profile):
+        args.func(args)
+    metrics.write_snapshot(args.command)
+
+if __name__ == "__main__":
+    main()
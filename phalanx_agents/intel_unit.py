@@ -1,21 +1,33 @@
 from pathlib import Path
-import json
-from intel_core.features import tcp_basic_features
+import json, time
+from intel_core.features import load_columns, features_from_columns
 from intel_core.rules import diagnose
 from intel_core.llm_explainer import explain
+from phalanx_agents import metrics, profiling
 
 ART = Path("artifacts"); ART.mkdir(exist_ok=True)
 
-def run(pcap_path: str = "artifacts/merged.pcap"):
-    feats = tcp_basic_features(pcap_path)
-    diag = diagnose(feats)
-    narrative = explain(diag)
-    (ART / "diagnosis.json").write_text(json.dumps(diag, indent=2))
-    (ART / "explanation.md").write_text(narrative)
+def run(pcap_path: str = "artifacts/merged.pcap", out_dir: Path = ART):
+    # One record per stage: the per-packet loop inside features_from_columns stays uninstrumented.
+    t0 = time.perf_counter()
+    with metrics.stage("decode"):
+        cols = load_columns(pcap_path)
+    with metrics.stage("features"):
+        feats = features_from_columns(cols)
+    metrics.PACKETS_PARSED.inc(feats["pkts"], stage="features")
+    metrics.PARSE_RATE.set(feats["pkts"] / max(time.perf_counter() - t0, 1e-9), stage="features")
+    with metrics.stage("diagnose"):
+        diag = diagnose(feats)
+    with metrics.stage("explain"):
+        narrative = explain(diag)
+    (out_dir / "diagnosis.json").write_text(json.dumps(diag, indent=2))
+    (out_dir / "explanation.md").write_text(narrative)
     return diag
 
 if __name__ == "__main__":
     import sys
+    profiling.from_argv("intel_unit")
     p = sys.argv[1] if len(sys.argv) > 1 else "artifacts/merged.pcap"
     result = run(p)
+    metrics.write_snapshot("intel_unit")
     print(json.dumps(result, indent=2))
@@ -0,0 +1,152 @@
+"""
+metrics.py
+Minimal Prometheus-style metrics registry for the pipeline stages.
+Counters, gauges and histograms keyed by label values. Recording is one dict
+update under a lock, so hot loops record once per stage, never per packet.
+Served on ingest_api GET /metrics; CLI runs and the Streamlit UI write a
+text snapshot to artifacts/metrics/<unit>.prom.
+"""
+from pathlib import Path
+from contextlib import contextmanager, ExitStack
+import os, threading, time
+
+ART = Path("artifacts"); ART.mkdir(exist_ok=True)
+METRICS_DIR = ART / "metrics"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+REGISTRY: dict[str, "_Metric"] = {}
+
+def _esc(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _num(v: float) -> str:
+    """Full precision: `:g` would round a 6000164-byte counter to 6.00016e+06."""
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+def _fmt_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.values = {}
+        REGISTRY[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self.values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_num(v)}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        k = self._key(labels)
+        with _lock:
+            self.values[k] = self.values.get(k, 0.0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        k = self._key(labels)
+        with _lock:
+            self.values[k] = float(value)
+
+    def inc(self, amount=1.0, **labels):
+        k = self._key(labels)
+        with _lock:
+            self.values[k] = self.values.get(k, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        k = self._key(labels)
+        with _lock:
+            counts, total = self.values.get(k, ([0] * (len(self.buckets) + 1), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1  # +Inf
+            self.values[k] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self.values.items())
+        for key, (counts, total) in items:
+            for bound, n in zip([f"{b:g}" for b in self.buckets] + ["+Inf"], counts):
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, [('le', bound)])} {n}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+# ---- Pipeline metrics -------------------------------------------
+STAGE_SECONDS   = Histogram("phalanx_stage_seconds", "Wall time per pipeline stage.", ["stage"])
+PACKETS_PARSED  = Counter("phalanx_packets_parsed_total", "Packets decoded from captures.", ["stage"])
+PARSE_RATE      = Gauge("phalanx_parse_packets_per_second", "Packet decode rate of the last run.", ["stage"])
+BYTES_MERGED    = Counter("phalanx_bytes_merged_total", "Bytes written to merged captures.")
+INGEST_BYTES    = Counter("phalanx_ingest_bytes_total", "Bytes received by the ingest API.", ["node"])
+INGEST_INFLIGHT = Gauge("phalanx_ingest_inflight", "Uploads currently being received by the ingest API.")
+CAPTURE_ALIVE   = Gauge("phalanx_capture_alive", "1 if the capture process for a node is running.", ["node"])
+CAPTURE_RATE    = Gauge("phalanx_capture_bytes_per_second", "Capture write rate per node.", ["node"])
+CAPTURE_DISK    = Gauge("phalanx_capture_disk_bytes", "Ring-file bytes on disk per node.", ["node"])
+CACHE_REQUESTS  = Counter("phalanx_cache_requests_total", "Cache lookups by result (hit/miss).", ["cache", "result"])
+QUEUE_DEPTH     = Gauge("phalanx_queue_depth", "Jobs waiting or running per work queue.", ["queue"])
+
+# Context-manager factories entered around every stage (e.g. profiling.py).
+STAGE_HOOKS: list = []
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into phalanx_stage_seconds{stage=name}."""
+    with ExitStack() as hooks:
+        for hook in STAGE_HOOKS:
+            hooks.enter_context(hook(name))
+        with STAGE_SECONDS.time(stage=name):
+            yield
+
+def render() -> str:
+    lines = []
+    for metric in list(REGISTRY.values()):
+        if metric.values:
+            lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def write_snapshot(unit: str) -> Path:
+    METRICS_DIR.mkdir(exist_ok=True)
+    out = METRICS_DIR / f"{unit}.prom"
+    # Textfile collectors must never see a partial file; the tmp name is per
+    # thread because the UI writes its snapshot from sessions and jobs alike.
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(render())
+    tmp.replace(out)
+    return out
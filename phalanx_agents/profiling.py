@@ -0,0 +1,154 @@
+"""
+profiling.py
+Opt-in per-stage profiler: `--profile` on the agent CLIs, PHALANX_PROFILE=1 or
+run_demo(profile=True) for demo mode.
+Hooks into metrics.stage, so every instrumented stage records wall time,
+thread CPU time and tracemalloc peak (above what was already allocated when the
+stage started, plus the absolute process peak), while a background thread samples the
+profiled thread's stack every few ms. Writes artifacts/profile/report.json and
+collapsed-stack files (<stage>.folded, all.folded) for flamegraph.pl/speedscope.
+"""
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+import atexit, json, os, sys, threading, time, tracemalloc
+
+from phalanx_agents import metrics
+
+ART = Path("artifacts"); ART.mkdir(exist_ok=True)
+PROFILE_DIR = ART / "profile"
+REPORT = PROFILE_DIR / "report.json"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+_active = None
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+class _Profiler:
+    def __init__(self, run: str, interval: float):
+        self.run = run
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stack = []   # [stage name, peak bytes seen so far, traced bytes at entry] for open stages
+        self.stats = {}   # stage -> {"calls", "wall_s", "cpu_s", "peak_bytes", "peak_abs_bytes"}
+        self.samples: dict[str, Counter] = {}
+        self.started = time.time()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="phalanx-profiler", daemon=True)
+
+    def start(self):
+        tracemalloc.start()
+        metrics.STAGE_HOOKS.append(self.hook)
+        self._sampler.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            top = self.stack[-1:]  # one read: hook may pop on the profiled thread meanwhile
+            if not top:
+                continue
+            stage = top[0][0]
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(_frame_label(frame))
+                frame = frame.f_back
+            if frames:
+                folded = ";".join([stage] + frames[::-1])
+                self.samples.setdefault(stage, Counter())[folded] += 1
+
+    @contextmanager
+    def hook(self, name: str):
+        if threading.get_ident() != self.thread_id:
+            yield
+            return
+        # Fold the peak so far into the parent before resetting it for this stage.
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1][1] = max(self.stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self.stack.append([name, 0, current])
+        wall0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall0, time.thread_time() - cpu0
+            _, peak = tracemalloc.get_traced_memory()
+            _, seen, base = self.stack.pop()
+            peak = max(seen, peak)
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], peak)
+            st = self.stats.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": 0, "peak_abs_bytes": 0})
+            st["calls"] += 1
+            st["wall_s"] += wall
+            st["cpu_s"] += cpu
+            st["peak_bytes"] = max(st["peak_bytes"], peak - base)
+            st["peak_abs_bytes"] = max(st["peak_abs_bytes"], peak)
+
+    def finish(self) -> dict:
+        self._stop.set()
+        self._sampler.join()
+        metrics.STAGE_HOOKS.remove(self.hook)
+        tracemalloc.stop()
+
+        PROFILE_DIR.mkdir(exist_ok=True)
+        for old in PROFILE_DIR.glob("*.folded"):
+            old.unlink()
+        every = Counter()
+        for stage, counts in self.samples.items():
+            (PROFILE_DIR / f"{stage}.folded").write_text("".join(f"{k} {n}\n" for k, n in counts.most_common()))
+            every.update(counts)
+        (PROFILE_DIR / "all.folded").write_text("".join(f"{k} {n}\n" for k, n in every.most_common()))
+
+        report = {
+            "run": self.run,
+            "started": self.started,
+            "wall_s": time.time() - self.started,
+            "sample_interval_s": self.interval,
+            "stages": [
+                {"stage": name, "calls": st["calls"], "wall_s": round(st["wall_s"], 6), "cpu_s": round(st["cpu_s"], 6),
+                 "peak_mb": round(st["peak_bytes"] / 2**20, 3), "peak_abs_mb": round(st["peak_abs_bytes"] / 2**20, 3),
+                 "samples": sum(self.samples.get(name, {}).values())}
+                for name, st in self.stats.items()
+            ],
+        }
+        REPORT.write_text(json.dumps(report, indent=2))
+        print(f"[+] Wrote profile: {REPORT}")
+        return report
+
+def enable(run: str, interval: float = SAMPLE_INTERVAL):
+    global _active
+    if _active is None:
+        _active = _Profiler(run, interval)
+        _active.start()
+    return _active
+
+def finish():
+    global _active
+    if _active is None:
+        return None
+    prof, _active = _active, None
+    return prof.finish()
+
+@contextmanager
+def session(run: str, enabled: bool = True):
+    """Profile the enclosed block (no-op when disabled or a session is already open)."""
+    if not enabled or _active is not None:
+        yield
+        return
+    enable(run)
+    try:
+        yield
+    finally:
+        finish()
+
+def from_argv(run: str) -> bool:
+    """Strip `--profile` from sys.argv (or honour PHALANX_PROFILE=1) and profile until exit."""
+    wanted = "--profile" in sys.argv or os.environ.get("PHALANX_PROFILE") == "1"
+    if "--profile" in sys.argv:
+        sys.argv.remove("--profile")
+    if wanted:
+        enable(run)
+        atexit.register(finish)
+    return wanted
@@ -1,21 +1,36 @@
-import sys
+import sys, time
 from pathlib import Path
-from scapy.all import rdpcap, wrpcap
+
+from phalanx_agents import metrics, profiling
 
 ART = Path("artifacts"); ART.mkdir(exist_ok=True)
 
-def merge_pcaps(pcap_paths, output_path):
+def merge_pcaps(pcap_paths, output_path, window=None):
+    """Merge captures by timestamp; `window=(t0, t1)` keeps only packets inside it."""
+    from scapy.all import rdpcap, wrpcap  # lazy: keeps CLI startup fast
     packets = []
-    for p in pcap_paths:
-        print(f"[+] Reading {p}")
-        packets.extend(rdpcap(str(p)))
-    packets.sort(key=lambda pkt: pkt.time)
-    wrpcap(str(output_path), packets)
+    t0 = time.perf_counter()
+    with metrics.stage("merge_read"):
+        for p in pcap_paths:
+            print(f"[+] Reading {p}")
+            packets.extend(rdpcap(str(p)))
+    metrics.PACKETS_PARSED.inc(len(packets), stage="merge")
+    metrics.PARSE_RATE.set(len(packets) / max(time.perf_counter() - t0, 1e-9), stage="merge")
+    if window:
+        lo, hi = window
+        packets = [pkt for pkt in packets if lo <= float(pkt.time) <= hi]
+    with metrics.stage("merge_sort"):
+        packets.sort(key=lambda pkt: pkt.time)
+    with metrics.stage("merge_write"):
+        wrpcap(str(output_path), packets)
+    metrics.BYTES_MERGED.inc(Path(output_path).stat().st_size)
     print(f"[+] Wrote merged PCAP: {output_path}")
     return output_path
 
 if __name__ == "__main__":
+    profiling.from_argv("stitch_unit")
     if len(sys.argv) < 3:
-        print("Usage: python -m phalanx_agents.stitch_unit <pcap1> <pcap2> [pcap3...]")
+        print("Usage: python -m phalanx_agents.stitch_unit [--profile] <pcap1> <pcap2> [pcap3...]")
         sys.exit(1)
     out = merge_pcaps(sys.argv[1:], Path("artifacts/merged.pcap"))  # use .pcap for scapy
+    metrics.write_snapshot("stitch_unit")
@@ -0,0 +1,97 @@
+"""
+trigger_unit.py
+Freeze the capture ring buffers around an alert before they rotate away.
+Hard-links every node's ring files that overlap [at - before, at + after] into
+artifacts/incidents/<incident>/<node>/ (same inode, no copy), then merges and
+analyzes just that window into the incident directory.
+"""
+from pathlib import Path
+from datetime import datetime, timezone
+import errno, json, os, re, shutil, sys, time
+
+from phalanx_agents.capture_unit import CAPDIR, MANIFEST, _ring_stats
+
+ART = Path("artifacts"); ART.mkdir(exist_ok=True)
+INCIDENTS = ART / "incidents"; INCIDENTS.mkdir(exist_ok=True)
+STAMP = re.compile(r"(\d{14})")  # dumpcap cap_00001_YYYYmmddHHMMSS / tcpdump cap_YYYYmmddHHMMSS
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+def _file_span(p: Path, end: float, duration: float) -> tuple[float, float]:
+    """(first, last) packet time of a ring file: start from its name, end from mtime."""
+    m = STAMP.search(p.name)
+    start = time.mktime(time.strptime(m.group(1), "%Y%m%d%H%M%S")) if m else end - duration
+    return start, end
+
+def _link(src: Path, dest: Path):
+    if dest.exists():
+        return
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(src, dest)  # incidents dir on another filesystem
+
+def freeze(incident: str, at: float, before=120, after=30) -> list[Path]:
+    """Link ring files overlapping the window from every node; safe to call repeatedly."""
+    t0, t1 = at - before, at + after
+    manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+    nodes = sorted(p.name for p in CAPDIR.iterdir() if p.is_dir())
+    frozen = []
+    for node in nodes:
+        duration = manifest.get(node, {}).get("duration", 30)
+        for p, st in _ring_stats(node):
+            start, end = _file_span(p, st.st_mtime, duration)
+            if end < t0 or start > t1:
+                continue
+            dest = INCIDENTS / incident / node / p.name
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                _link(p, dest)
+            except FileNotFoundError:
+                continue  # rotated out between the listing and the link
+            frozen.append(dest)
+    return frozen
+
+def trigger(incident: str | None = None, at: float | None = None, before=120, after=30, analyze=True) -> dict:
+    at = at if at is not None else time.time()
+    incident = incident or datetime.fromtimestamp(at, timezone.utc).strftime("%Y%m%dT%H%M%S")
+    if not SAFE_NAME.match(incident):
+        raise SystemExit(f"invalid incident name: {incident!r}")
+    idir = INCIDENTS / incident
+    idir.mkdir(parents=True, exist_ok=True)
+
+    # Freeze what exists now, so nothing before the alert can rotate out while
+    # we wait for the post-trigger part of the window to be written.
+    freeze(incident, at, before, after)
+    wait = at + after - time.time()
+    if wait > 0:
+        print(f"⏳ holding {wait:.0f}s for post-trigger window")
+        time.sleep(wait)
+    frozen = freeze(incident, at, before, after)
+
+    info = {"incident": incident, "at": at, "window": [at - before, at + after],
+            "files": [str(p.relative_to(idir)) for p in frozen]}
+    if analyze and frozen:
+        from phalanx_agents.stitch_unit import merge_pcaps
+        from phalanx_agents.intel_unit import run as run_analysis
+        merged = idir / "merged.pcap"
+        merge_pcaps(frozen, merged, window=(at - before, at + after))
+        info["diagnosis"] = run_analysis(str(merged), out_dir=idir)
+    (idir / "incident.json").write_text(json.dumps(info, indent=2))
+    print(f"🧊 froze {len(frozen)} ring files → {idir}")
+    return info
+
+if __name__ == "__main__":
+    # --at <epoch seconds>: centre the window on when the alert fired, not on now
+    at = None
+    if "--at" in sys.argv:
+        i = sys.argv.index("--at")
+        at = float(sys.argv[i + 1])
+        del sys.argv[i:i + 2]
+    if len(sys.argv) < 2:
+        print("Usage:\n  python -m phalanx_agents.trigger_unit <incident> [before_s] [after_s] [--at <epoch_s>]\nExample:\n  python -m phalanx_agents.trigger_unit checkout-latency 300 60 --at 1760880000")
+        raise SystemExit(1)
+    before = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+    after = float(sys.argv[3]) if len(sys.argv) > 3 else 30
+    trigger(sys.argv[1], at, before=before, after=after)
@@ -0,0 +1,55 @@
+"""
+compression.py
+Streaming file compression shared by the capture agent and the ingest API.
+zstd when the optional `zstandard` package is installed, gzip otherwise.
+Output is deterministic (no gzip mtime), so a re-compressed file keeps the
+same bytes and upload offsets stay valid across agent restarts.
+"""
+from pathlib import Path
+import gzip, hashlib, shutil
+
+# Optional dep handled gracefully
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+ENCODINGS = ("zstd", "gzip", "identity")
+DEFAULT_ENCODING = "zstd" if zstandard is not None else "gzip"
+BLOCK = 1 << 20
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def compress_file(src: Path, dest: Path, encoding: str = DEFAULT_ENCODING):
+    tmp = dest.with_name(dest.name + ".tmp")
+    with src.open("rb") as fin, tmp.open("wb") as fout:
+        if encoding == "zstd":
+            zstandard.ZstdCompressor(level=3).copy_stream(fin, fout)
+        elif encoding == "gzip":
+            with gzip.GzipFile(fileobj=fout, mode="wb", compresslevel=6, mtime=0) as gz:
+                shutil.copyfileobj(fin, gz, BLOCK)
+        else:
+            shutil.copyfileobj(fin, fout, BLOCK)
+    tmp.replace(dest)
+
+def decompress_file(src: Path, dest: Path, encoding: str) -> str:
+    """Decompress src into dest; returns the sha256 of the decompressed bytes."""
+    h = hashlib.sha256()
+    with src.open("rb") as fin, dest.open("wb") as fout:
+        if encoding == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to decode zstd uploads")
+            reader = zstandard.ZstdDecompressor().stream_reader(fin)
+        elif encoding == "gzip":
+            reader = gzip.GzipFile(fileobj=fin, mode="rb")
+        else:
+            reader = fin
+        for block in iter(lambda: reader.read(BLOCK), b""):
+            h.update(block)
+            fout.write(block)
+    return h.hexdigest()
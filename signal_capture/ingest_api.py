@@ -1,17 +1,133 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from datetime import datetime
-import shutil
+from contextlib import asynccontextmanager
+import asyncio, json, re, shutil, threading, time
+
+from phalanx_agents.trigger_unit import trigger, SAFE_NAME, INCIDENTS
+from phalanx_agents import metrics
+from signal_capture.compression import BLOCK, ENCODINGS, decompress_file
 
 app = FastAPI(title="Phalanx Ingest API")
 
 ART_DIR = Path("artifacts")
 ART_DIR.mkdir(exist_ok=True)
+INCOMING = ART_DIR / "incoming"; INCOMING.mkdir(exist_ok=True)
+RECEIVED = INCOMING / "received.json"  # sha256 -> saved path, for dedupe across agents/restarts
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+received = json.loads(RECEIVED.read_text()) if RECEIVED.exists() else {}
+_received_lock = threading.Lock()          # _finalize runs on threadpool workers
+_stream_locks: dict[str, list] = {}        # digest -> [asyncio.Lock, requests holding or waiting]
 
 @app.post("/upload")
 async def upload_pcap(node: str = Form(...), hop: int = Form(...), pcap: UploadFile = File(...)):
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
     dest = ART_DIR / f"{ts}_hop{hop}_{node}.pcapng"
-    with dest.open("wb") as f:
-        shutil.copyfileobj(pcap.file, f)
+    metrics.INGEST_INFLIGHT.inc()
+    try:
+        with metrics.stage("ingest_upload"), dest.open("wb") as f:
+            shutil.copyfileobj(pcap.file, f)
+    finally:
+        metrics.INGEST_INFLIGHT.dec()
+    metrics.INGEST_BYTES.inc(dest.stat().st_size, node=node)
     return {"status":"ok","saved":str(dest)}
+
+@app.post("/trigger")
+async def trigger_snapshot(background: BackgroundTasks, incident: str = Form(...), before: float = Form(120), after: float = Form(30),
+                           at: float | None = Form(None)):
+    if not SAFE_NAME.match(incident):
+        raise HTTPException(status_code=400, detail="invalid incident name")
+    # Freeze + merge + analyze runs after the response; the alert hook returns immediately.
+    # Alert pipelines often deliver late: centre on when the alert fired if given.
+    at = at if at is not None else time.time()
+    background.add_task(trigger, incident, at, before, after)
+    return {"status":"accepted","incident":incident,"at":at,"dir":str(INCIDENTS / incident)}
+
+# ---- Resumable compressed streaming (capture_unit agent) -------------
+# The agent PUTs the compressed ring file in chunks to /stream/<sha256 of the
+# raw file>?offset=N; GET tells it where to resume. The last chunk is
+# decompressed, verified against the digest and saved like /upload.
+
+def _check_digest(digest: str):
+    if not DIGEST.match(digest):
+        raise HTTPException(status_code=400, detail="digest must be a lowercase sha256 hex string")
+
+@asynccontextmanager
+async def _stream_lock(digest: str):
+    """Serialize requests for one digest. The entry lives while any request
+    holds or waits on it, so every request for a digest shares one lock."""
+    entry = _stream_locks.setdefault(digest, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _stream_locks[digest]
+
+def _finalize(digest: str, part: Path, encoding: str, node: str, hop: int, name: str) -> str:
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    suffix = ".pcapng" if name.endswith(".pcapng") else ".pcap"
+    dest = ART_DIR / f"{ts}_hop{hop}_{node}_{digest[:12]}{suffix}"
+    got = decompress_file(part, dest, encoding)
+    part.unlink(missing_ok=True)
+    if got != digest:
+        dest.unlink(missing_ok=True)
+        raise HTTPException(status_code=422, detail="content hash mismatch; restart from offset 0")
+    with _received_lock:
+        received[digest] = str(dest)
+        tmp = RECEIVED.with_name(RECEIVED.name + ".tmp")
+        tmp.write_text(json.dumps(received, indent=2))
+        tmp.replace(RECEIVED)  # never leave a half-written file for the next startup
+    return str(dest)
+
+@app.get("/stream/{digest}")
+async def stream_status(digest: str):
+    _check_digest(digest)
+    if digest in received:
+        return {"complete": True, "saved": received[digest]}
+    part = INCOMING / f"{digest}.part"
+    return {"complete": False, "received": part.stat().st_size if part.exists() else 0}
+
+@app.put("/stream/{digest}")
+async def stream_chunk(digest: str, request: Request, node: str, total: int, offset: int = 0, hop: int = 0,
+                       name: str = "", encoding: str = "gzip"):
+    _check_digest(digest)
+    if not SAFE_NAME.match(node) or encoding not in ENCODINGS:
+        raise HTTPException(status_code=400, detail="invalid node or encoding")
+    async with _stream_lock(digest):
+        if digest in received:
+            return {"status":"duplicate","saved":received[digest]}
+        part = INCOMING / f"{digest}.part"
+        have = part.stat().st_size if part.exists() else 0
+        if offset != have:
+            raise HTTPException(status_code=409, detail={"received": have})
+        metrics.INGEST_INFLIGHT.inc()
+        try:
+            # Disk writes go to the threadpool, batched so small body chunks
+            # don't each pay a thread hop.
+            buf = bytearray()
+            with part.open("ab") as f:
+                async for chunk in request.stream():
+                    buf += chunk
+                    if len(buf) >= BLOCK:
+                        await run_in_threadpool(f.write, buf)
+                        buf.clear()
+                if buf:
+                    await run_in_threadpool(f.write, buf)
+        finally:
+            metrics.INGEST_INFLIGHT.dec()
+        size = part.stat().st_size
+        metrics.INGEST_BYTES.inc(size - have, node=node)
+        if size < total:
+            return {"status":"partial","received":size}
+        saved = await run_in_threadpool(_finalize, digest, part, encoding, node, hop, name)
+        return {"status":"ok","saved":saved}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
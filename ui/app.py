@@ -1,5 +1,4 @@
 import sys
-import json
 from pathlib import Path
 import streamlit as st
 
@@ -13,12 +12,14 @@ SCENARIOS_DIR = Path("campaign_scenarios")
 DEFAULT_SCENARIO = SCENARIOS_DIR / "01_cross_domain_causality.md"
 ART = Path("artifacts")
 STATUS_PATH = ART / "status.json"
+MANIFEST_PATH = ART / "captures" / "manifest.json"
+PROFILE_REPORT = ART / "profile" / "report.json"
 
 # --- Session flags ---
 if "show_scenario" not in st.session_state:
     st.session_state.show_scenario = False
-if "demo_running" not in st.session_state:
-    st.session_state.demo_running = False
+if "demo_started" not in st.session_state:
+    st.session_state.demo_started = None
 if "scenario_choice" not in st.session_state:
     st.session_state.scenario_choice = str(DEFAULT_SCENARIO)
 
@@ -26,14 +27,23 @@ if "scenario_choice" not in st.session_state:
 st.set_page_config(page_title="Phalanx SRE", layout="wide")
 st.title("Phalanx SRE — Coordinated intelligence for the modern SRE battlefield")
 
+# --- Shared state (one per process, shared by every session) ---
+from ui.shared import FileCache, JobRunner
+
+@st.cache_resource
+def file_cache() -> FileCache:
+    return FileCache()
+
+@st.cache_resource
+def job_runner() -> JobRunner:
+    return JobRunner()
+
+files = file_cache()
+jobs = job_runner()
+
 # --- Helpers ---
 def load_status():
-    if STATUS_PATH.exists():
-        try:
-            return json.loads(STATUS_PATH.read_text())
-        except Exception:
-            return {}
-    return {}
+    return files.json(STATUS_PATH) or {}
 
 def badge(ok: bool) -> str:
     return "✅" if ok else "❌"
@@ -53,34 +63,60 @@ st.markdown(
     f"- Active Captures: {len(status.get('captures', {})) if isinstance(status.get('captures', {}), dict) else 0}"
 )
 
-cols = st.columns([1, 1, 6])
+# Capture health, written into the manifest by `capture_unit supervise` every
+# tick; read the manifest itself, since status.json is only refreshed on demand.
+captures = files.json(MANIFEST_PATH)
+captures = captures if isinstance(captures, dict) else {}
+health_rows = [{"node": node, **entry["health"]} for node, entry in captures.items() if isinstance(entry, dict) and "health" in entry]
+if health_rows:
+    with st.expander("Capture health", expanded=any(not r.get("alive") or r.get("pressure_level") for r in health_rows)):
+        usage = health_rows[0].get("disk_usage", 0); budget = health_rows[0].get("disk_budget") or 1
+        st.progress(min(1.0, usage / budget), text=f"Capture disk: {usage / 2**20:.1f} / {budget / 2**20:.0f} MiB")
+        st.table([{k: v for k, v in r.items() if k not in ("disk_usage", "disk_budget", "checked_at")} for r in health_rows])
+
+cols = st.columns([1, 1, 1, 5])
 with cols[0]:
     if st.button("🔄 Refresh status"):
         st.rerun()
+job = jobs.state()
+job_running = bool(job and not job["done"])
 with cols[1]:
-    if st.button("🎬 Demo Mode", disabled=st.session_state.demo_running):
-        st.session_state.demo_running = True
-        with st.spinner("Generating sample PCAPs, merging, analyzing…"):
-            try:
-                from ui.demo_mode import run_demo
-            except ModuleNotFoundError:
-                sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-                from ui.demo_mode import run_demo
-            try:
-                result = run_demo()
-                st.session_state.demo_running = False
-                if result.get("ok"):
-                    st.session_state.show_scenario = True
-                    # ensure default scenario is selected after demo
-                    if DEFAULT_SCENARIO.exists():
-                        st.session_state.scenario_choice = str(DEFAULT_SCENARIO)
-                    st.success("Demo artifacts generated. Refreshing…")
-                    st.rerun()
-                else:
-                    st.error(result.get("error", "Demo failed"))
-            except Exception as e:
-                st.session_state.demo_running = False
-                st.error(f"Demo failed: {e}")
+    if st.button("🎬 Demo Mode", disabled=job_running):
+        try:
+            from ui.demo_mode import run_demo
+        except ModuleNotFoundError:
+            sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+            from ui.demo_mode import run_demo
+        # Runs on the shared worker; this session (and every other) just polls progress.
+        if jobs.submit("demo", run_demo, profile=st.session_state.get("profile_demo", False)):
+            st.session_state.demo_started = jobs.state()["started"]
+        st.rerun()
+with cols[2]:
+    st.checkbox("⏱️ Profile demo", key="profile_demo", help="Write per-stage timings and flame files to artifacts/profile/")
+
+# While a shared job runs, only this fragment reruns (1 Hz) to poll progress;
+# the whole page reruns once, when the job has finished.
+@st.fragment(run_every=1 if job_running else None)
+def job_progress():
+    current = jobs.state()
+    if current and not current["done"]:
+        st.progress(current["progress"], text=f"{current['name']}: {current['step']}…")
+    elif job_running:
+        st.rerun()
+
+job_progress()
+if not job_running and job and job["started"] == st.session_state.demo_started:
+    # Finished job this session started: report once.
+    st.session_state.demo_started = None
+    result = job["result"] or {}
+    if result.get("ok"):
+        st.session_state.show_scenario = True
+        # ensure default scenario is selected after demo
+        if DEFAULT_SCENARIO.exists():
+            st.session_state.scenario_choice = str(DEFAULT_SCENARIO)
+        st.success("Demo artifacts generated.")
+    else:
+        st.error(result.get("error", "Demo failed"))
 
 st.divider()
 
@@ -91,13 +127,15 @@ with col1:
     st.subheader("Root Cause & Evidence")
     dpath = ART / "diagnosis.json"
     epath = ART / "explanation.md"
-    if dpath.exists():
-        st.json(json.loads(dpath.read_text()))
+    diagnosis = files.json(dpath)
+    if diagnosis is not None:
+        st.json(diagnosis)
     else:
         st.info("No diagnosis yet. Merge or place a PCAP at artifacts/merged.pcap then run: "
                 "`python -m phalanx_agents.intel_unit artifacts/merged.pcap`")
-    if epath.exists():
-        st.markdown(epath.read_text())
+    explanation = files.text(epath)
+    if explanation is not None:
+        st.markdown(explanation)
 
     # Scenario picker
     st.divider()
@@ -110,9 +148,9 @@ with col1:
             index=max(0, scenarios.index(str(DEFAULT_SCENARIO)) if str(DEFAULT_SCENARIO) in scenarios else 0),
         )
         if st.session_state.get("show_scenario"):
-            scenepath = Path(st.session_state.scenario_choice)
-            if scenepath.exists():
-                st.markdown(scenepath.read_text())
+            scenario_md = files.text(Path(st.session_state.scenario_choice))
+            if scenario_md is not None:
+                st.markdown(scenario_md)
             else:
                 st.info("Selected scenario file not found.")
     else:
@@ -126,13 +164,27 @@ with col2:
     st.code("python -m phalanx_agents.intel_unit artifacts/merged.pcap", language="bash")
     st.write("3) Refresh this page")
 
+    # Stage breakdown from the last `--profile` run
+    report = files.json(PROFILE_REPORT) or {}
+    if report.get("stages"):
+        st.subheader("Last Profile")
+        st.caption(f"{report.get('run')} — {report.get('wall_s', 0):.2f}s total · flame files in artifacts/profile/*.folded")
+        st.table([{"stage": r["stage"], "wall s": f"{r['wall_s']:.3f}", "cpu s": f"{r['cpu_s']:.3f}", "peak MB": f"{r['peak_mb']:.1f}",
+                   "process peak MB": f"{r.get('peak_abs_mb', r['peak_mb']):.1f}"}
+                  for r in sorted(report["stages"], key=lambda r: r["wall_s"], reverse=True)])
+
 st.divider()
 
 # --- Battlemap (simple topology preview) ---
 st.subheader("Battlemap (Topology Preview)")
 from battlemap.topology_map import render_battlemap_if_available
-render_battlemap_if_available()
+from phalanx_agents import metrics
+with metrics.stage("battlemap"):
+    render_battlemap_if_available()
 
 st.divider()
 st.subheader("Demo Scenarios")
-st.write("Open `campaign_scenarios/` for the 5 Palantir-inspired SRE use cases.")
\ No newline at end of file
+st.write("Open `campaign_scenarios/` for the 5 Palantir-inspired SRE use cases.")
+
+# Export this process's cache/queue/battlemap metrics for scraping.
+metrics.write_snapshot("ui")
@@ -7,22 +7,21 @@ Create a full demo in-place:
 - Emit status.json
 """
 from pathlib import Path
-import json
-from scapy.all import IP, TCP, Ether, wrpcap, conf
+import json, os, sys
 
 from phalanx_agents.stitch_unit import merge_pcaps
 from phalanx_agents.intel_unit import run as run_analysis
 from phalanx_agents.viz_unit import snapshot
+from phalanx_agents import metrics, profiling
 
 ART = Path("artifacts")
 ART.mkdir(exist_ok=True)
 
-conf.verb = 0  # quiet scapy
-
 SRC_MAC = "aa:aa:aa:aa:aa:aa"
 DST_MAC = "bb:bb:bb:bb:bb:bb"
 
 def _mk(ts, src, sport, dst, dport, flags="S", seq=0, ack=0, ttl=64, payload=b""):
+    from scapy.all import IP, TCP, Ether
     p = Ether(src=SRC_MAC, dst=DST_MAC)/IP(src=src, dst=dst, ttl=ttl)/TCP(sport=sport, dport=dport, flags=flags, seq=seq, ack=ack)
     if payload: p = p/payload
     p.time = ts
@@ -30,6 +29,8 @@ def _mk(ts, src, sport, dst, dport, flags="S", seq=0, ack=0, ttl=64, payload=b""
 
 def _build_convo():
     import time
+    from scapy.all import conf
+    conf.verb = 0  # quiet scapy
     base = time.time()
     A="10.0.0.10"; B="10.0.2.40"; sport=51822; dport=443
     syn    = _mk(base+0.000, A, sport, B, dport, "S",  seq=1000, ttl=64)
@@ -40,6 +41,7 @@ def _build_convo():
     return [syn, synack, ack, data1, ack2]
 
 def _write_hops(pkts):
+    from scapy.all import IP, wrpcap
     h1 = ART/"sample_hop1.pcap"; wrpcap(str(h1), pkts)
     hop2=[]
     for p in pkts:
@@ -50,15 +52,27 @@ def _write_hops(pkts):
     h2 = ART/"sample_hop2.pcap"; wrpcap(str(h2), hop2)
     return h1, h2
 
-def run_demo():
+def run_demo(profile: bool = False, progress=None):
+    """`progress(step, fraction)` is called between steps (used by the UI job runner)."""
+    profile = profile or os.environ.get("PHALANX_PROFILE") == "1"
+    report = progress or (lambda step, fraction: None)
     try:
-        pkts = _build_convo()
-        h1, h2 = _write_hops(pkts)
-        merged = ART/"merged.pcap"
-        merge_pcaps([str(h1), str(h2)], merged)
-        run_analysis(str(merged))
-        snapshot()
+        with profiling.session("demo", enabled=profile):
+            report("Generating sample PCAPs", 0.0)
+            with metrics.stage("demo_build"):
+                pkts = _build_convo()
+                h1, h2 = _write_hops(pkts)
+            report("Merging hops", 0.3)
+            merged = ART/"merged.pcap"
+            merge_pcaps([str(h1), str(h2)], merged)
+            report("Analyzing", 0.6)
+            run_analysis(str(merged))
+            report("Updating status", 0.9)
+            snapshot()
         return {"ok": True, "merged": str(merged)}
     except Exception as e:
         (ART/"demo_error.json").write_text(json.dumps({"error": str(e)}))
-        return {"ok": False, "error": str(e)}
\ No newline at end of file
+        return {"ok": False, "error": str(e)}
+
+if __name__ == "__main__":
+    print(json.dumps(run_demo(profile="--profile" in sys.argv), indent=2))
@@ -0,0 +1,82 @@
+"""
+shared.py
+Process-wide state shared by every Streamlit session (held via st.cache_resource):
+- FileCache: artifact reads keyed by (mtime, size); a rerun costs one stat()
+  per file and only re-reads when the pipeline has rewritten it.
+- JobRunner: a single background worker for long jobs such as Demo Mode,
+  with progress every session can poll instead of blocking one session.
+Metrics recorded here live in the Streamlit process; app.py and finished jobs
+write them to artifacts/metrics/ui.prom.
+"""
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import json, threading, time
+
+from phalanx_agents import metrics
+
+class FileCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (path, kind) -> (mtime_ns, size, value)
+
+    def _read(self, path: Path, kind: str, parse):
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = (str(path), kind)
+        with self._lock:
+            hit = self._entries.get(key)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            metrics.CACHE_REQUESTS.inc(cache="ui_files", result="hit")
+            return hit[2]
+        metrics.CACHE_REQUESTS.inc(cache="ui_files", result="miss")
+        try:
+            value = parse(path.read_text())
+        except Exception:
+            return None  # half-written or malformed; next rerun retries
+        with self._lock:
+            self._entries[key] = (st.st_mtime_ns, st.st_size, value)
+        return value
+
+    def text(self, path: Path):
+        return self._read(path, "text", str)
+
+    def json(self, path: Path):
+        return self._read(path, "json", json.loads)
+
+class JobRunner:
+    """One job at a time on a worker thread; sessions poll state() for progress."""
+
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phalanx-job")
+        self._lock = threading.Lock()
+        self._job = None
+
+    def submit(self, name: str, fn, **kwargs) -> bool:
+        with self._lock:
+            if self._job and not self._job["done"]:
+                return False
+            self._job = {"name": name, "started": time.time(), "step": "queued", "progress": 0.0,
+                         "done": False, "result": None}
+        metrics.QUEUE_DEPTH.set(1, queue="ui_jobs")
+        self._pool.submit(self._run, fn, kwargs)
+        return True
+
+    def _progress(self, step: str, fraction: float):
+        with self._lock:
+            self._job.update(step=step, progress=fraction)
+
+    def _run(self, fn, kwargs):
+        try:
+            result = fn(progress=self._progress, **kwargs)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        with self._lock:
+            self._job.update(done=True, result=result, progress=1.0, step="done", finished=time.time())
+        metrics.QUEUE_DEPTH.set(0, queue="ui_jobs")
+        metrics.write_snapshot("ui")
+
+    def state(self):
+        with self._lock:
+            return dict(self._job) if self._job else None